@@ -78,8 +78,6 @@
 #                crashes at shutdown when __canvas gets set to None before
 #                the last drawing operations are attempted.
 #
-import pprint
-
 from sys import exit 
 
 try:
@@ -90,8 +88,11 @@ except:
   print("SimpleGraphics.py with Python v2.x.y instead of Python v3.x.y.")
   exit()
 
-from time import sleep
+from time import sleep, monotonic as __monotonic
 from threading import Lock
+from contextlib import contextmanager
+from collections import deque
+from functools import lru_cache
 
 try:
   import tkinter as tk
@@ -103,6 +104,14 @@ try:
 except:
   exit("SimpleGraphics failed to import the required Tk Interface font library.")
 
+# NumPy is optional.  When it is available it is used to speed up operations
+# on long lists of coordinates.
+try:
+  import numpy as np
+  __haveNumpy = True
+except ImportError:
+  __haveNumpy = False
+
 # Tcl/Tk master window and canvas
 __master = None
 __canvas = None
@@ -123,8 +132,27 @@ __joinstyle = tk.ROUND
 __arrow = tk.NONE
 __arrowshape = "8 10 3"
 __autoupdate = True
+
+# The options passed to Tk when drawing shapes and lines, built from the
+# properties above.  They are stored as flat tuples of Tcl option names and 
+# values so that they can be handed to the canvas create command directly.  
+# They are rebuilt lazily when a property changes.
+__shapeOptions = ()
+__lineOptions = ()
+__optionsDirty = True
+
+__batchDepth = 0
+
+# The time at which pending events were last processed by an automatic
+# update, and the shortest time allowed between two such updates (in seconds)
+__lastUpdate = 0
+__updateInterval = 1 / 60
+
 __font = None
-__font_count = 0
+
+# Text measurements that have already been made, indexed by the name of the
+# font and the text measured (or None for the line spacing)
+__measurements = {}
 
 # The current mouse pointer locations on the canvas
 __mouseX = 0
@@ -132,11 +160,21 @@ __mouseY = 0
 __b1down = False
 __b2down = False
 __b3down = False
-__mouseEvents = []
-__mouseEventLock = Lock()
 
-# Keyboard state
-__typed = ""
+# The position of the canvas on the screen, or None if it needs to be 
+# retrieved from Tk because the window has been moved or resized
+__rootX = None
+__rootY = None
+
+# Pending mouse events.  The Tk event handlers append to the right end and
+# getMouseEvent removes from the left end.  Both operations are atomic on a
+# deque so no lock is needed.
+__mouseEvents = deque()
+
+# Keyboard state.  The characters typed are held in a ring buffer so that
+# the oldest character is discarded once the buffer limit is reached.
+__typed = deque(maxlen=1024)
+__typedNewlines = 0
 __typedLock = Lock()
 __keys = set()
 __keysLock = Lock()
@@ -145,6 +183,16 @@ __heldLock = Lock()
 
 __background = None
 __bgcolor = "#d0d0d0"
+
+# An image covering the canvas that points are drawn into, and the canvas
+# item used to display it
+__pointsImage = None
+__pointsItem = None
+
+# Canvas items that are moved and reconfigured in place rather than being
+# drawn again, indexed by the type of item and the handle supplied by the
+# programmer, so that each type of item has its own set of handles
+__persistentItems = {}
   
 ## Create a window containing a canvas and setup a second thread to ensure
 #  that it stays up to date.  Setup the handlers needed for keyboard and 
@@ -171,6 +219,7 @@ def __init():
   __master.bind("<Button-3>", __button3pressed)
   __master.bind("<ButtonRelease-3>", __button3released)
   __master.bind("<FocusOut>", __focusOut)
+  __master.bind("<Configure>", __configure)
 
   # Ensure that mainloop is called before the program exits 
   register(__shutdown)
@@ -188,55 +237,48 @@ def __init():
   update()
   __master.focus_set()
 
+# Forget the cached position of the canvas when the window is moved or resized
+# @param event the event data associated with the Configure event
+def __configure(event):
+  global __rootX
+  global __rootY
+  __rootX = None
+  __rootY = None
+
 # Clear all keys being held when our window loses focus
 # @param event the event data associated with the FocusOut event
 def __focusOut(event):
-  __heldLock.acquire()
-  __heldKeys.clear()
-  __heldLock.release()
+  with __heldLock:
+    __heldKeys.clear()
 
 # Record the status of mouse button 1
 # @param event the event data associated with the mouse button press
 def __button1pressed(event):
   global __b1down
   __b1down = True
-  __mouseEventLock.acquire()
-  __mouseEvents.append(("<Button-1>", mousePos())) 
-  __mouseEventLock.release()
+  __mouseEvents.append(("<Button-1>", __eventPos(event)))
 
 # Record the status of mouse button 1
 # @param event the event data associated with the mouse button release
 def __button1released(event):
   global __b1down
   __b1down = False
-  __mouseEventLock.acquire()
-  __mouseEvents.append(("<ButtonRelease-1>", mousePos()))
-  __mouseEventLock.release()
+  __mouseEvents.append(("<ButtonRelease-1>", __eventPos(event)))
 
 def getMouseEvent():
-  __mouseEventLock.acquire()
-  if len(__mouseEvents) == 0:
-    __mouseEventLock.release()
+  try:
+    return __mouseEvents.popleft()
+  except IndexError:
     return None
-  else:
-    retval = __mouseEvents.pop(0)
-    __mouseEventLock.release()
-    return retval
 
 def peekMouseEvent():
-  __mouseEventLock.acquire()
-  if len(__mouseEvents) == 0:
-    __mouseEventLock.release()
+  try:
+    return __mouseEvents[0]
+  except IndexError:
     return None
-  else:
-    retval = __mouseEvents[0]
-    __mouseEventLock.release()
-    return retval
 
 def clearMouseEvents():
-  __mouseEventLock.acquire()
   __mouseEvents.clear()
-  __mouseEventLock.release()
 
 # Return true if and only if the left button is currently depressed
 # @param the current pressed status of the left mouse button
@@ -248,18 +290,14 @@ def leftButtonPressed():
 def __button2pressed(event):
   global __b2down
   __b2down = True
-  __mouseEventLock.acquire()
-  __mouseEvents.append(("<Button-2>", mousePos())) 
-  __mouseEventLock.release()
+  __mouseEvents.append(("<Button-2>", __eventPos(event)))
 
 # Record the status of mouse button 2
 # @param event the event data associated with the mouse button release
 def __button2released(event):
   global __b2down
   __b2down = False
-  __mouseEventLock.acquire()
-  __mouseEvents.append(("<ButtonRelease-2>", mousePos()))
-  __mouseEventLock.release()
+  __mouseEvents.append(("<ButtonRelease-2>", __eventPos(event)))
 
 # Return true if and only if the left button is currently depressed
 # @param the current pressed status of the middle mouse button
@@ -274,18 +312,14 @@ def middleButtonPressed():
 def __button3pressed(event):
   global __b3down
   __b3down = True
-  __mouseEventLock.acquire()
-  __mouseEvents.append(("<Button-3>", mousePos())) 
-  __mouseEventLock.release()
+  __mouseEvents.append(("<Button-3>", __eventPos(event)))
 
 # Record the status of mouse button 3
 # @param event the event data associated with the mouse button release
 def __button3released(event):
   global __b3down
   __b3down = False
-  __mouseEventLock.acquire()
-  __mouseEvents.append(("<ButtonRelease-3>", mousePos()))
-  __mouseEventLock.release()
+  __mouseEvents.append(("<ButtonRelease-3>", __eventPos(event)))
 
 # Return true if and only if the left button is currently depressed
 # @param the current pressed status of the middle mouse button
@@ -298,44 +332,39 @@ def rightButtonPressed():
 ## Event handler that runs when a key is pressed.
 #  @param event the key event, with the key in the char field
 def __key(event):
-  global __typed
+  global __typedNewlines
   if event.char != "":
-    __typedLock.acquire()
-    try:
+    with __typedLock:
       # If backspace is pressed
       if ord(event.char) == 8:
         if len(__typed) > 0:
-          __typed = __typed[:-1]
-      # If we haven't hit the input buffer limit
-      elif len(__typed) < 1024:
-        __typed = __typed + event.char
-      # We have hit the buffer limit
+          if __typed.pop() in "\r\n":
+            __typedNewlines -= 1
+      # Otherwise append the character, discarding the oldest one if we have 
+      # hit the input buffer limit
       else:
-        __typed = __typed[1:] + event.char
-    finally:
-      # Release the lock no matter what
-      __typedLock.release()
-      pass;
+        if len(__typed) == __typed.maxlen and __typed[0] in "\r\n":
+          __typedNewlines -= 1
+        if event.char in "\r\n":
+          __typedNewlines += 1
+        __typed.append(event.char)
 
   if event.keysym != "":
-    __keysLock.acquire()
-    __keys.add(event.keysym)
-    __keysLock.release()
+    with __keysLock:
+      __keys.add(event.keysym)
 
-    __heldLock.acquire()
-    __heldKeys.add(event.keysym)
-    __heldLock.release()
+    with __heldLock:
+      __heldKeys.add(event.keysym)
 
 ## Event handler that runs when a key is pressed.
 #  @param event the key event, with the key in the char field
 def __keyRelease(event):
   if event.keysym != "":
-    __heldLock.acquire()
-    if event.keysym in __heldKeys:
-      __heldKeys.remove(event.keysym)
-    else:
-      pass
-    __heldLock.release()
+    with __heldLock:
+      if event.keysym in __heldKeys:
+        __heldKeys.remove(event.keysym)
+      else:
+        pass
 
 
 ## Event handler that runs when the close button is clicked or escape is 
@@ -380,45 +409,67 @@ def setWindowTitle(t):
   __master.wm_title(t)
 
 
-## Update the canvas if the programmer has automatic updates turned on
+## Update the canvas if the programmer has automatic updates turned on.  The
+#  canvas is redrawn every time, but the mouse and keyboard events are only
+#  processed once every __updateInterval seconds so that drawing many 
+#  primitives back-to-back doesn't handle the event queue for each one.
 def __update():
-  try:
-    if __canvas != None and __autoupdate:
-      __canvas.update()
-  finally:
-    pass;
+  global __lastUpdate
+  if not __autoupdate or __batchDepth > 0 or __canvas == None:
+    return
+  now = __monotonic()
+  if now - __lastUpdate >= __updateInterval:
+    __lastUpdate = now
+    __canvas.update()
+  else:
+    __canvas.update_idletasks()
 
 ## Force the canvas to update 
 def update():
   if __canvas != None:
     __canvas.update()
 
+## Suppress the automatic updates performed by each graphics primitive for
+#  the duration of a with block, then update the canvas once when the
+#  outermost block exits.  Blocks can be nested.
+#
+#  with batchedDraw():
+#    for i in range(100):
+#      line(i, 0, i, 100)
+@contextmanager
+def batchedDraw():
+  global __batchDepth
+  __batchDepth += 1
+  try:
+    yield
+  finally:
+    __batchDepth -= 1
+    if __batchDepth == 0:
+      update()
+
 ## Return all of the input typed by the user, removing it from the input buffer
 def getTyped():
-  global __typed
-
-  __typedLock.acquire()
-  result = __typed
-  __typed = ""
-  __typedLock.release()
+  global __typedNewlines
+  with __typedLock:
+    result = "".join(__typed)
+    __typed.clear()
+    __typedNewlines = 0
 
   return result
 
 ## Return any input typed by the user without removing it from the input buffer
 def peekTyped():
-  __typedLock.acquire()
-  result = __typed
-  __typedLock.release()
+  with __typedLock:
+    result = "".join(__typed)
 
   return result
 
 ## Return a set of all of the keys pressed since the last time getKeys was
 #  called.
 def getKeys():
-  __keysLock.acquire()
-  retval = __keys.copy()
-  __keys.clear()
-  __keysLock.release()
+  with __keysLock:
+    retval = __keys.copy()
+    __keys.clear()
 
   return retval
 
@@ -426,9 +477,8 @@ def getKeys():
 #  Note that if the window does not have focus then the set of keys returned
 #  will be empty, even if there are keys being pressed.
 def getHeldKeys():
-  __heldLock.acquire()
-  retval = __heldKeys.copy()
-  __heldLock.release()
+  with __heldLock:
+    retval = __heldKeys.copy()
 
   return retval
 
@@ -436,9 +486,8 @@ def getHeldKeys():
 ## Return a set of all of the keys pressed since the last time getKeys was
 #  called.  Does not clear the set of keys that have been pressed.
 def peekKeys():
-  __keysLock.acquire()
-  retval = set(__keys)
-  __keysLock.release()
+  with __keysLock:
+    retval = set(__keys)
 
   return retval
 
@@ -446,18 +495,12 @@ def peekKeys():
 #  Return an empty string if a newline has not yet been entered.  Any
 #  characters returned are removed from the input buffer.
 def getTypedLine():
-  global __typed
-  result = ""
-
-  __typedLock.acquire()
-  crpos = __typed.find(chr(10))
-  lfpos = __typed.find(chr(13))
-
-  if crpos >= 0 or lfpos >= 0:
-    result = __typed[:max(crpos, lfpos) + 1]
-    __typed = __typed[max(crpos, lfpos) + 1:]
-
-  __typedLock.release()
+  global __typedNewlines
+  with __typedLock:
+    result = __typedLine()
+    for i in range(len(result)):
+      __typed.popleft()
+    __typedNewlines -= result.count(chr(10)) + result.count(chr(13))
 
   return result
 
@@ -465,19 +508,26 @@ def getTypedLine():
 #  Return an empty string if a newline has not yet been entered.  Any
 #  characters returned remain in the input buffer.
 def peekTypedLine():
-  global __typed
-  result = ""
-
-  __typedLock.acquire()
-  crpos = __typed.find(chr(10))
-  lfpos = __typed.find(chr(13))
-
-  if crpos >= 0 or lfpos >= 0:
-    result = __typed[:max(crpos, lfpos) + 1]
-  __typedLock.release()
+  with __typedLock:
+    result = __typedLine()
 
   return result
 
+## Find the characters at the start of the input buffer that make up the 
+#  first line.  The buffer is only searched when a newline character is known
+#  to be present, so polling for a line that has not been entered yet does not
+#  scan the buffer.  The caller must hold __typedLock.
+#  @return the first line, including its newline character(s), or an empty
+#          string if a newline has not yet been entered
+def __typedLine():
+  if __typedNewlines == 0:
+    return ""
+
+  typed = "".join(__typed)
+  crpos = typed.find(chr(10))
+  lfpos = typed.find(chr(13))
+  return typed[:max(crpos, lfpos) + 1]
+
 """
 ## Read a line of text from the user, typed into the graphics window.  This
 #  function blocks until enter is pressed.
@@ -516,11 +566,15 @@ def readLine():
   return retval
 """
 
-## Has the user clicked the close button?
+## Has the user clicked the close button?  Any pending events (and then any
+#  idle tasks, such as deferred redraws) are processed first.  Unlike 
+#  update(), this does not wait for a round trip to the display server, so it
+#  is cheap enough to be polled in a tight loop.
 #  @return True if the close button has been clicked, False otherwise.
 def closed():
   try:
-    __master.update()
+    while __master.tk.dooneevent(tk._tkinter.DONT_WAIT):
+      pass
     return __closePressed
   except:
     return True
@@ -530,11 +584,16 @@ def closed():
 def mousePos():
   global __mouseX
   global __mouseY
+  global __rootX
+  global __rootY
 
   try:
     (x, y) = __canvas.winfo_pointerxy()
-    x = x - __canvas.winfo_rootx()
-    y = y - __canvas.winfo_rooty()
+    if __rootX == None:
+      __rootX = __canvas.winfo_rootx()
+      __rootY = __canvas.winfo_rooty()
+    x = x - __rootX
+    y = y - __rootY
     __mouseX = x
     __mouseY = y
     return (__mouseX, __mouseY)
@@ -542,6 +601,28 @@ def mousePos():
   except AttributeError:
     return (__mouseX, __mouseY)
 
+## Retrieve the location of a mouse event on the canvas.  The location is
+#  computed from the screen position stored in the event so that, unlike 
+#  mousePos, Tk does not need to be queried for the pointer location.
+#  @param event the event data associated with a mouse event
+#  @return a tuple containing the mouse X location and mouse Y location
+def __eventPos(event):
+  global __mouseX
+  global __mouseY
+  global __rootX
+  global __rootY
+
+  try:
+    if __rootX == None:
+      __rootX = __canvas.winfo_rootx()
+      __rootY = __canvas.winfo_rooty()
+    __mouseX = event.x_root - __rootX
+    __mouseY = event.y_root - __rootY
+    return (__mouseX, __mouseY)
+
+  except AttributeError:
+    return (__mouseX, __mouseY)
+
 ## Retrieve the x portion of the mouse cursor's position
 #  @return the x position of the mouse cursor
 def mouseX():
@@ -552,16 +633,61 @@ def mouseX():
 def mouseY():
   return mousePos()[1]
 
+## Convert red, green and blue components into a Tk color string.  The 
+#  results are cached because drawing loops frequently set the same colors
+#  over and over again.
+#  @param r the red component of the color
+#  @param g the green component of the color
+#  @param b the blue component of the color
+#  @return a string of the form #rrggbb
+@lru_cache(maxsize=4096)
+def __hexColor(r, g, b):
+  return "#%02x%02x%02x" % (r, g, b)
+
+## Rebuild the options used to draw shapes and lines from the current drawing
+#  properties
+def __refreshOptions():
+  global __shapeOptions
+  global __lineOptions
+  global __optionsDirty
+
+  __shapeOptions = __flatOptions(fill=__fill, outline=__outline, width=__width)
+  __lineOptions = __flatOptions(fill=__outline, width=__width, capstyle=__capstyle, joinstyle=__joinstyle, arrow=__arrow, arrowshape=__arrowshape)
+  __optionsDirty = False
+
+## Convert options into a flat tuple of Tcl option names and values.  As with
+#  tkinter's own option handling, options with a value of None are omitted.
+#  @param options the options, as keyword arguments
+#  @return a tuple of the form ("-name1", value1, "-name2", value2, ...)
+def __flatOptions(**options):
+  result = []
+  for (name, value) in options.items():
+    if value != None:
+      result.append("-" + name)
+      result.append(value)
+  return tuple(result)
+
+## Create an item on the canvas.  The arguments are passed straight to the
+#  Tcl canvas create command, which avoids the conversion of keyword 
+#  arguments into Tcl options that tkinter performs for every create_* call.
+#  @param itemType the type of item to create, such as "line" or "oval"
+#  @param args the coordinates of the item followed by its options
+#  @return the id of the new item
+def __create(itemType, *args):
+  return __canvas.tk.getint(__canvas.tk.call(__canvas._w, "create", itemType, *args))
+
 ## Set the outline color
 #  @param r the red component of the color, or the color name
 #  @param g the green component of the color, or None if a named color is used
 #  @param b the blue component of the color, or None if a named color is used
 def setOutline(r, g=None, b=None):
   global __outline
+  global __optionsDirty
+  __optionsDirty = True
   if g == None and b == None:
     __outline = r
   elif g != None and b != None:
-    __outline = "#%02x%02x%02x" % (int(r), int(g), int(b))
+    __outline = __hexColor(int(r), int(g), int(b))
   else:
     raise TypeError("setOutline cannot be called with 2 arguments")
 
@@ -571,10 +697,12 @@ def setOutline(r, g=None, b=None):
 #  @param b the blue component of the color, or None if a named color is used
 def setFill(r, g=None, b=None):
   global __fill
+  global __optionsDirty
+  __optionsDirty = True
   if g == None and b == None:
     __fill = r
   elif g != None and b != None:
-    __fill = "#%02x%02x%02x" % (int(r), int(g), int(b))
+    __fill = __hexColor(int(r), int(g), int(b))
   else:
     raise TypeError("setFill cannot be called with 2 arguments")
 
@@ -582,6 +710,8 @@ def setFill(r, g=None, b=None):
 #  @param w the width of the line in pixels (default is 1)
 def setWidth(w=1):
   global __width
+  global __optionsDirty
+  __optionsDirty = True
   __width = w
 
 ## Set the cap style used when lines are drawn (only matters for wide lines for
@@ -590,6 +720,8 @@ def setWidth(w=1):
 #         tk.ROUND
 def setCapStyle(s = tk.BUTT):
   global __capstyle
+  global __optionsDirty
+  __optionsDirty = True
   __capstyle = s
 
 ## Set the cap style used when lines / shapes are drawn (only matters for wide 
@@ -598,6 +730,8 @@ def setCapStyle(s = tk.BUTT):
 #         tk.MITER
 def setJoinStyle(s = tk.ROUND):
   global __joinstyle
+  global __optionsDirty
+  __optionsDirty = True
   __joinstyle = s
 
 ## Set the arrow style used when lines are drawn (only matters for lines
@@ -606,6 +740,8 @@ def setJoinStyle(s = tk.ROUND):
 #         tk.LAST or tk.BOTH
 def setArrow(s = tk.NONE):
   global __arrow
+  global __optionsDirty
+  __optionsDirty = True
   __arrow = s
 
 ## Set the shape of the arrow head that appears on lines and curves (when
@@ -616,6 +752,8 @@ def setArrow(s = tk.NONE):
 #         the outside edge of the arrow
 def setArrowShape(a = 8, b = 10, c = 3):
   global __arrowshape
+  global __optionsDirty
+  __optionsDirty = True
   __arrowshape = "%d %d %d" % (a, b, c)
 
 ## Set both the fill and outline colors to the same value
@@ -639,7 +777,7 @@ def background(r, g=None, b=None):
     if g == None and b == None:
       bg = r
     elif g != None and b != None:
-      bg = "#%02x%02x%02x" % (int(r), int(g), int(b))
+      bg = __hexColor(int(r), int(g), int(b))
     else:
       raise TypeError("background cannot be called with 2 arguments")
     __bgcolor = bg
@@ -655,19 +793,27 @@ def background(r, g=None, b=None):
   finally:
     pass;
 
+## Shift a sequence of coordinates by one pixel in each direction, which is
+#  needed to line the points up with the edges of the canvas
+#  @param pts the coordinates in the form x1, y1, x2, y2, ... , xn, yn
+#  @return a new list containing the shifted coordinates
+def __offsetPoints(pts):
+  if __haveNumpy and len(pts) > 64:
+    return (np.asarray(pts) + 1).tolist()
+  return [p + 1 for p in pts]
+
 ## Draw a line connecting the points provided as a parameter
 #  @param the points of the line in the form x1, y1, x2, y2, ... , xn, yn.
 #         The parameter can either be a single list or provided as individual
 #         parameters.
 def line(*pts):
   try:
+    if __optionsDirty:
+      __refreshOptions()
     if len(pts) == 1:
-      new_pts = pts[0]
-    else:
-      new_pts = list(pts)
-    for i in range(len(new_pts)):
-      new_pts[i] = new_pts[i] + 1
-    __canvas.create_line(new_pts, fill=__outline, width=__width, capstyle=__capstyle, joinstyle=__joinstyle, arrow=__arrow, arrowshape=__arrowshape)
+      pts = pts[0]
+    new_pts = __offsetPoints(pts)
+    __create("line", new_pts, *__lineOptions)
     __update()
 
   except Exception as e:
@@ -689,14 +835,13 @@ def line(*pts):
 #         parameters.
 def curve(*pts):
   try:
+    if __optionsDirty:
+      __refreshOptions()
     if len(pts) == 1:
-      new_pts = pts[0]
-    else:
-      new_pts = list(pts)
-    for i in range(len(new_pts)):
-      new_pts[i] = new_pts[i] + 1
+      pts = pts[0]
+    new_pts = __offsetPoints(pts)
 
-    __canvas.create_line(new_pts, fill=__outline, width=__width, capstyle=__capstyle, smooth=True, splinesteps=25, joinstyle=__joinstyle, arrow=__arrow, arrowshape=__arrowshape)
+    __create("line", new_pts, "-smooth", True, "-splinesteps", 25, *__lineOptions)
     __update()
 
   except Exception as e:
@@ -719,14 +864,55 @@ def curve(*pts):
 #         parameters.
 def blob(*pts):
   try:
+    if __optionsDirty:
+      __refreshOptions()
     if len(pts) == 1:
-      new_pts = pts[0]
+      pts = pts[0]
+    new_pts = __offsetPoints(pts)
+
+    __create("polygon", new_pts, "-smooth", 1, "-joinstyle", __joinstyle, *__shapeOptions)
+    __update()
+
+  except Exception as e:
+    if __canvas == None:
+      pass;
     else:
-      new_pts = list(pts)
-    for i in range(len(new_pts)):
-      new_pts[i] = new_pts[i] + 1
+      raise e
 
-    __canvas.create_polygon(new_pts, fill=__fill, outline=__outline, smooth=1, width=__width, joinstyle=__joinstyle)
+  finally:
+    pass;
+
+## Draw individual pixels in the outline color.  Rather than creating a 
+#  canvas item for every point, the points are written into a single image 
+#  that covers the canvas, so large scatter plots remain fast to draw and 
+#  redraw.  The image is displayed above the items that were on the canvas 
+#  when points was first called after the canvas was last cleared.  Points
+#  that fall outside of the canvas are ignored.
+#  @param the points in the form x1, y1, x2, y2, ... , xn, yn.  The parameter
+#         can either be a single list or provided as individual parameters.
+def points(*pts):
+  global __pointsImage
+  global __pointsItem
+
+  try:
+    if len(pts) == 1:
+      pts = pts[0]
+
+    w = getWidth()
+    h = getHeight()
+    if __pointsImage == None or __pointsImage.width() != w or __pointsImage.height() != h:
+      __pointsImage = tk.PhotoImage(width=w, height=h)
+      if __pointsItem != None:
+        __canvas.itemconfig(__pointsItem, image=__pointsImage)
+    if __pointsItem == None:
+      __pointsItem = __canvas.create_image(1, 1, image=__pointsImage, anchor="nw")
+
+    put = __pointsImage.put
+    for i in range(0, len(pts) - 1, 2):
+      x = int(pts[i])
+      y = int(pts[i + 1])
+      if 0 <= x < w and 0 <= y < h:
+        put(__outline, to=(x, y))
     __update()
 
   except Exception as e:
@@ -744,11 +930,17 @@ def blob(*pts):
 #  @param w the width of the rectangle
 #  @param h the height of the rectangle
 def rect(x, y, w, h):
-  w = round(w)
-  h = round(h)
+  if type(w) is not int:
+    w = round(w)
+  if type(h) is not int:
+    h = round(h)
   try:
-    if abs(w) >= 2 and abs(h) >= 2:
-      __canvas.create_rectangle(x + 1, y + 1, x + 1 + w - 1, y + 1 + h - 1, fill=__fill, outline=__outline, width=__width)
+    if __optionsDirty:
+      __refreshOptions()
+    # Check for the common case of a rectangle that is at least 2 pixels wide
+    # and tall first, without calling abs
+    if (w >= 2 or w <= -2) and (h >= 2 or h <= -2):
+      __create("rectangle", x + 1, y + 1, x + w, y + h, *__shapeOptions)
       __update()
     elif abs(w) == 1:
       line(x, y, x, y + h - 1)
@@ -766,6 +958,38 @@ def rect(x, y, w, h):
   finally:
     pass;
 
+## Draw a rectangle that is identified by a handle.  The first call with a
+#  handle creates the rectangle.  Subsequent calls move and recolor the 
+#  existing rectangle instead of drawing a new one, which is much cheaper for
+#  shapes that are redrawn every frame.
+#  @param handle a hashable value (such as a string) that names the rectangle
+#  @param x the x part of the coordinate of the upper left corner
+#  @param y the y part of the coordinate of the upper left corner
+#  @param w the width of the rectangle
+#  @param h the height of the rectangle
+def rectItem(handle, x, y, w, h):
+  try:
+    if __optionsDirty:
+      __refreshOptions()
+    coords = (x + 1, y + 1, x + w, y + h)
+    key = ("rectangle", handle)
+    if key in __persistentItems:
+      item = __persistentItems[key]
+      __canvas.coords(item, *coords)
+      __canvas.tk.call(__canvas._w, "itemconfigure", item, *__shapeOptions)
+    else:
+      __persistentItems[key] = __create("rectangle", *coords, *__shapeOptions)
+    __update()
+
+  except Exception as e:
+    if __canvas == None:
+      pass;
+    else:
+      raise e
+
+  finally:
+    pass;
+
 ## Draw an ellipse
 #  @param x the x part of the coordinate of the upper left corner
 #  @param y the y part of the coordinate of the upper left corner
@@ -773,7 +997,40 @@ def rect(x, y, w, h):
 #  @param h the height of the ellipse
 def ellipse(x, y, w, h):
   try:
-    __canvas.create_oval(x + 1, y + 1, x+w, y+h, fill=__fill, outline=__outline, width=__width)
+    if __optionsDirty:
+      __refreshOptions()
+    __create("oval", x + 1, y + 1, x+w, y+h, *__shapeOptions)
+    __update()
+
+  except Exception as e:
+    if __canvas == None:
+      pass;
+    else:
+      raise e
+
+  finally:
+    pass
+
+## Draw an ellipse that is identified by a handle.  The first call with a
+#  handle creates the ellipse.  Subsequent calls move and recolor the existing
+#  ellipse instead of drawing a new one.
+#  @param handle a hashable value (such as a string) that names the ellipse
+#  @param x the x part of the coordinate of the upper left corner
+#  @param y the y part of the coordinate of the upper left corner
+#  @param w the width of the ellipse
+#  @param h the height of the ellipse
+def ellipseItem(handle, x, y, w, h):
+  try:
+    if __optionsDirty:
+      __refreshOptions()
+    coords = (x + 1, y + 1, x+w, y+h)
+    key = ("oval", handle)
+    if key in __persistentItems:
+      item = __persistentItems[key]
+      __canvas.coords(item, *coords)
+      __canvas.tk.call(__canvas._w, "itemconfigure", item, *__shapeOptions)
+    else:
+      __persistentItems[key] = __create("oval", *coords, *__shapeOptions)
     __update()
 
   except Exception as e:
@@ -804,15 +1061,57 @@ def text(x, y, what, align="c"):
   finally:
     pass
 
-# Set the current font, size and modifiers.  Note that this function call is
-# rather slow (at least on Cygwin)
+## Place some text on the canvas that is identified by a handle.  The first 
+#  call with a handle creates the text.  Subsequent calls move and update the
+#  existing text instead of creating a new item, which avoids accumulating
+#  items for labels such as scores that change every frame.
+#  @param handle a hashable value (such as a string) that names the text
+#  @param x the x part of the coordinate of the where the text will be placed
+#  @param y the y part of the coordinate of the where the text will be placed
+#  @param what the string of text to display
+#  @param align the alignment to use (by default, center the text at (x,y))
+def textItem(handle, x, y, what, align="c"):
+  try:
+    key = ("text", handle)
+    if key in __persistentItems:
+      item = __persistentItems[key]
+      __canvas.coords(item, x + 1, y + 1)
+      __canvas.itemconfig(item, text=str(what), anchor=align, fill=__outline, font=__font)
+    else:
+      __persistentItems[key] = __canvas.create_text(x + 1, y + 1, text=str(what), anchor=align, fill=__outline, font=__font)
+    __update()
+
+  except Exception as e:
+    if __canvas == None:
+      pass;
+    else:
+      raise e
+
+  finally:
+    pass
+
+# Retrieve the font object for a family, size and set of modifiers.  Creating
+# a font is rather slow (at least on Cygwin), so each distinct font is only
+# created once.
+# @param f the name of the font
+# @param s the size of the font
+# @param w the weight of the font (font.BOLD or font.NORMAL)
+# @param sl the slant of the font (font.ITALIC or font.ROMAN)
+# @param und True if the font is underlined, False otherwise
+# @param ovs True if the font is overstruck, False otherwise
+# @return the font object
+@lru_cache(maxsize=128)
+def __getFont(f, s, w, sl, und, ovs):
+  return font.Font(family=f, size=s, weight=w, slant=sl, underline=und, overstrike=ovs)
+
+# Set the current font, size and modifiers.  Fonts are cached, so switching
+# back to a font that was used previously is fast.
 # @param f the name of a font.  For example Times or Arial
 # @param the size of the font (larger numbers are bigger)
 # @param modifiers for the font such as bold and italic.  Multiple modifiers
 #        should be separated by spaces such as "bold italic"
 def setFont(f=None, s=10, modifiers=""):
   global __font
-  global __font_count
 
   if f == None:
     __font = None
@@ -842,8 +1141,7 @@ def setFont(f=None, s=10, modifiers=""):
       else:
         ovs = False
 
-      __font = font.Font(family=f, size=s, name=str(__font_count), weight=w, slant=sl, underline=und, overstrike=ovs)
-      __font_count += 1
+      __font = __getFont(f, s, w, sl, und, ovs)
       return True
     except Exception as e:
       __font = None
@@ -854,7 +1152,12 @@ def setFont(f=None, s=10, modifiers=""):
 # @return the width required to display s in pixels
 def textWidth(s):
   try:
-    return __font.measure(s)
+    key = (__font.name, s)
+    if key not in __measurements:
+      if len(__measurements) >= 4096:
+        __measurements.clear()
+      __measurements[key] = __font.measure(s)
+    return __measurements[key]
   except:
     return -1
 
@@ -864,7 +1167,10 @@ def textWidth(s):
 # @return the number of pixel that should be used between adjacent lines of text
 def lineSpace(s=""):
   try:
-    return __font.metrics("linespace")
+    key = (__font.name, None)
+    if key not in __measurements:
+      __measurements[key] = __font.metrics("linespace")
+    return __measurements[key]
   except:
     return -1
 
@@ -920,7 +1226,9 @@ def getHeight(what=None):
 #  @param e the extent of the arc (*not* the ending angle)
 def arc(x, y, w, h, s, e):
   try:
-    __canvas.create_arc(x + 1, y + 1, x+1+w, y+1+h, start=s, extent=e, fill=__fill, outline=__outline, style=tk.ARC, width=__width)
+    if __optionsDirty:
+      __refreshOptions()
+    __create("arc", x + 1, y + 1, x+1+w, y+1+h, "-start", s, "-extent", e, "-style", tk.ARC, *__shapeOptions)
     __update()
 
   except Exception as e:
@@ -942,59 +1250,75 @@ def arc(x, y, w, h, s, e):
 #  @param s the starting angle
 #  @param e the extent of the arc (*not* the ending angle)
 def pieSlice(x, y, w, h, s, e):
-  try:
-    __canvas.create_arc(x + 1, y + 1, x+1+w, y+1+h, start=s, extent=e, fill=__fill, outline=__outline, style=tk.PIESLICE, width=__width)
-    __update()
+  if __canvas == None:
+    return
 
-  except Exception as e:
-    if __canvas == None:
-      pass;
-    else:
-      raise e
-
-  finally:
-    pass
+  if __optionsDirty:
+    __refreshOptions()
+  __create("arc", x + 1, y + 1, x+1+w, y+1+h, "-start", s, "-extent", e, "-style", tk.PIESLICE, *__shapeOptions)
+  __update()
 
 ## Draw a filled polygon connecting each point to its neighbors using
 #  straight line segments.
 #  @param the points of the polygon in the form x1, y1, x2, y2, ... , xn, yn.
-def polygon(x1, y1=[], *args):
-  try:
-    if y1 != []:
-      pts = [x1, y1]
-      pts.extend(args)
-    else:
-      pts = list(x1)
-      pts.extend(y1)
-      pts.extend(args)
-
-    for i in range(len(pts)):
-      pts[i] = pts[i] + 1
-    __canvas.create_polygon(pts, fill=__fill, outline=__outline, width=__width, joinstyle=__joinstyle)
-    __update()
-
-  except Exception as e:
-    if __canvas == None:
-      pass;
-    else:
-      raise e
+#         The parameter can either be a single list or provided as individual
+#         parameters.
+def polygon(*pts):
+  if len(pts) == 1:
+    polygonPts(pts[0])
+    return
+  if __canvas == None:
+    return
+
+  if __optionsDirty:
+    __refreshOptions()
+  __create("polygon", __offsetPoints(pts), "-joinstyle", __joinstyle, *__shapeOptions)
+  __update()
 
-  finally:
-    pass
+## Draw a filled polygon from a single sequence of points.  This avoids
+#  unpacking the points into separate parameters, and NumPy arrays are
+#  offset without converting each coordinate to a Python number first.
+#  @param pts the points of the polygon in the form x1, y1, x2, y2, ... , xn, yn,
+#         or a NumPy array of coordinates with any shape
+def polygonPts(pts):
+  if __canvas == None:
+    return
+
+  if __optionsDirty:
+    __refreshOptions()
+  if __haveNumpy and isinstance(pts, np.ndarray):
+    pts = (pts.ravel() + 1).tolist()
+  else:
+    pts = __offsetPoints(pts)
+  __create("polygon", pts, "-joinstyle", __joinstyle, *__shapeOptions)
+  __update()
 
-## Remove all drawing objects from the canvas
+## Remove all drawing objects from the canvas.  The background rectangle is
+#  kept and reset rather than being deleted and created again.
 def clear():
+  global __background
+  global __pointsItem
+
   try:
-    __canvas.delete("all")
-    __background = __canvas.create_rectangle(0, 0, getWidth(), getHeight(), fill=__bgcolor, outline=__bgcolor, tag="__background")
+    __canvas.delete("!__background")
+    if __background == None:
+      __background = __canvas.create_rectangle(0, 0, getWidth()+1, getHeight()+1, fill=__bgcolor, outline=__bgcolor, tag="__background")
+    else:
+      __canvas.coords(__background, 0, 0, getWidth()+1, getHeight()+1)
+      __canvas.itemconfig(__background, fill=__bgcolor, outline=__bgcolor)
+    if __pointsImage != None:
+      __pointsImage.blank()
   except AttributeError:
     pass;
 
   __image_references.clear()
+  __persistentItems.clear()
+  __pointsItem = None
   __update()
 
 ## Should the screen be updated automatically after each graphics primitive
-#  is drawn?
+#  is drawn?  When automatic updates are turned off, drawing only appears on
+#  the screen when update() or closed() is called.
 def setAutoUpdate(status):
   global __autoupdate
   __autoupdate = status
@@ -1022,13 +1346,29 @@ def createImage(w, h):
   retval = tk.PhotoImage(width=w, height=h)
   return retval
 
-## Create a new image by loading an image file in .gif or .ppm format
+## Load an image file, caching the result so that each file is only decoded
+#  once
+#  @param fname the name of the file to load
+#  @return an image object loaded with the data from the file
+@lru_cache(maxsize=256)
+def __loadPhoto(fname):
+  return tk.PhotoImage(file=fname)
+
+## Create a new image by loading an image file in .gif or .ppm format.  Loaded
+#  images are cached, so loading the same file again returns the same image
+#  object without reading the file.  Note that this means that changes made to
+#  the image (such as with putPixel) are visible to every caller that loaded
+#  it.  Use clearImageCache to force files to be read again.
 #  @param fname the name of the file to load
-#  @return a new image object loaded with the data from the file
+#  @return an image object loaded with the data from the file
 def loadImage(fname):
-  retval = tk.PhotoImage(file=fname)
+  retval = __loadPhoto(fname)
   return retval
 
+## Discard all of the images cached by loadImage
+def clearImageCache():
+  __loadPhoto.cache_clear()
+
 ## Write a pixel into an image
 #  @param img the image to modify
 #  @param x the x position that will be modified
@@ -1038,7 +1378,45 @@ def loadImage(fname):
 #  @param b the blue component of the new pixel color
 #  @return (None)
 def putPixel(img, x, y, r, g, b):
-  img.put("#%02x%02x%02x" % (int(r), int(g), int(b)), to=(x,y))
+  img.put(__hexColor(int(r), int(g), int(b)), to=(x,y))
+
+## Write a rectangular block of pixels into an image with a single call to Tk,
+#  which is much faster than calling putPixel for each pixel
+#  @param img the image to modify
+#  @param x the x position of the upper left corner of the block
+#  @param y the y position of the upper left corner of the block
+#  @param pixels the pixels to write, given as a list of rows where each row
+#         is a list of (r, g, b) tuples, or as a NumPy array with shape
+#         (height, width, 3)
+#  @return (None)
+def putPixels(img, x, y, pixels):
+  if __haveNumpy:
+    block = __pixelBlock(np.asarray(pixels))
+  else:
+    rows = []
+    for row in pixels:
+      rows.append(" ".join([__hexColor(int(r), int(g), int(b)) for (r, g, b) in row]))
+    block = "{" + "} {".join(rows) + "}"
+  img.put(block, to=(x,y))
+
+## Build the Tk color string for a block of pixels without looping over the
+#  pixels in Python.  Each pixel becomes the 8 characters "#rrggbb " and each
+#  row is wrapped in braces.
+#  @param arr a NumPy array of pixel colors with shape (height, width, 3)
+#  @return a string of the form {#rrggbb #rrggbb ... } {#rrggbb ... } ...
+def __pixelBlock(arr):
+  h, w = arr.shape[0], arr.shape[1]
+  digits = np.frombuffer(b"".join([b"%02x" % i for i in range(256)]), dtype=np.uint8).reshape(256, 2)
+
+  rows = np.empty((h, w * 8 + 3), dtype=np.uint8)
+  rows[:, 0] = ord("{")
+  rows[:, -2] = ord("}")
+  rows[:, -1] = ord(" ")
+  cells = rows[:, 1:-2].reshape(h, w, 8)
+  cells[:, :, 0] = ord("#")
+  cells[:, :, 1:7] = digits[arr.astype(np.uint8)].reshape(h, w, 6)
+  cells[:, :, 7] = ord(" ")
+  return rows.tobytes().decode("ascii")
 
 ## Draw the provided image with its upper left corner at position (x, y)
 #  @param img the image to display
@@ -1048,19 +1426,12 @@ def putPixel(img, x, y, r, g, b):
 def drawImage(img, x, y):
   global __image_references
 
-  try:
-    __canvas.create_image(x+1, y+1, image=img, anchor="nw")
-    __image_references.add(img)
-    __update()
-
-  except Exception as e:
-    if __canvas == None:
-      pass;
-    else:
-      raise e
+  if __canvas == None:
+    return
 
-  finally:
-    pass;
+  __canvas.create_image(x+1, y+1, image=img, anchor="nw")
+  __image_references.add(img)
+  __update()
 
 
 ## Save the contents of an image to a PPM file
@@ -1107,3 +1478,30 @@ try:
 except AttributeError:
   def getPixel(img, x, y):
     return img.get(x, y)
+
+## Read every pixel in an image with a single call to Tk, which is much faster
+#  than calling getPixel for each pixel
+#  @param img the image to read
+#  @return a NumPy array of pixel colors with shape (height, width, 3), or a
+#          list of rows where each row is a list of (r, g, b) tuples if NumPy
+#          is not available
+def getPixels(img):
+  data = img.tk.call(img.name, "data", "-format", "ppm")
+  if isinstance(data, str):
+    data = data.encode("latin-1")
+
+  # The data begins with a header of the form "P6 width height maxval" followed
+  # by a single whitespace character and then the pixels
+  header = data.split(maxsplit=4)
+  w = int(header[1])
+  h = int(header[2])
+  pixels = data[len(data) - w * h * 3:]
+
+  if __haveNumpy:
+    return np.frombuffer(pixels, dtype=np.uint8).reshape(h, w, 3).copy()
+
+  rows = []
+  for i in range(0, len(pixels), w * 3):
+    row = pixels[i:i + w * 3]
+    rows.append([(row[j], row[j+1], row[j+2]) for j in range(0, len(row), 3)])
+  return rows
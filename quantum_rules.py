@@ -1,84 +1,142 @@
 import numpy as np
 import math
+from functools import lru_cache
+
+# The gate matrices below are constants, so they are all stored as read-only
+# complex arrays.
 
 #Identity matrix
 I = np.array([[1,0],
-              [0,1]])
+              [0,1]], dtype=np.complex128)
 rootX = np.array([[complex(0.5,0.5),complex(0.5,-0.5)],
-               [complex(0.5,-0.5), complex(0.5,0.5)]])
+               [complex(0.5,-0.5), complex(0.5,0.5)]], dtype=np.complex128)
 
 # Hadamard gate
 H = np.array([[1/np.sqrt(2),1/np.sqrt(2)],
-                  [1/np.sqrt(2),-1/np.sqrt(2)]])
+                  [1/np.sqrt(2),-1/np.sqrt(2)]], dtype=np.complex128)
 S= np.array([[1,0],
-               [0, complex(0,math.sin(math.pi/2))]])
+               [0, complex(0,math.sin(math.pi/2))]], dtype=np.complex128)
 
 #X gate
 X = np.array([[0,1],
-               [1,0]])
+               [1,0]], dtype=np.complex128)
 
 #Y gate
 Y = np.array([[0, -1.j],
-               [1.j, 0]])
+               [1.j, 0]], dtype=np.complex128)
 
 #Z gate
 Z = np.array([[1,0],
-               [0,-1]])
+               [0,-1]], dtype=np.complex128)
+
+# The gates that can appear on the board, stacked into a single (5, 2, 2)
+# array in the order used by the numbers stored in the board, so that
+# gates[n] is the matrix for the gate numbered n.
+gates = np.ascontiguousarray(np.stack([I, H, X, Y, Z]))
+
+for _gate in (I, rootX, H, S, X, Y, Z, gates):
+    _gate.setflags(write=False)
+del _gate
+
+# The same gates, in the same order, for use by the search below.  They are
+# stored exactly as (M, k), where M is an int8 array holding the real (M[0])
+# and imaginary (M[1]) parts of the matrix multiplied by sqrt(2)**k, so that
+# products can be formed without any floating point round-off.  k is the
+# smallest power that makes every entry a whole number.
+def _exact_gate(G):
+    for k in (0, 1):
+        scaled = G * math.sqrt(2) ** k
+        M = np.stack([scaled.real, scaled.imag])
+        rounded = np.rint(M)
+        if np.allclose(M, rounded, rtol=0, atol=1e-12):
+            return (rounded.astype(np.int8), k)
+    raise ValueError("gate cannot be stored exactly: %s" % G)
+
+_gates = [_exact_gate(G) for G in gates]
+
+# Multiply two exactly stored matrices.  The result is reduced so that k is
+# as small as possible, which gives every matrix a single representation.
+def _exact_dot(A, B):
+    (a, j) = A
+    (b, k) = B
+    M = np.stack([a[0] @ b[0] - a[1] @ b[1], a[0] @ b[1] + a[1] @ b[0]])
+    k = j + k
+    while k >= 2 and not (M % 2).any():
+        M //= 2
+        k -= 2
+    return (M, k)
+
+# Products of these gates only ever produce a small, finite set of matrices
+# (the Pauli matrices and H times the Pauli matrices, each with a phase of 1,
+# -1, i or -i).  Rather than multiplying matrices, the search below works with
+# the index of each matrix in that set and a table that gives the index of
+# the product of any member of the set with any gate.
+def _matrix_key(A):
+    return (A[0].tobytes(), A[1])
+
+def _build_group(gates):
+    elements = [gates[0]]
+    ids = {_matrix_key(elements[0]): 0}
+    table = []
+    i = 0
+    while i < len(elements):
+        row = []
+        for g in gates:
+            A = _exact_dot(elements[i], g)
+            key = _matrix_key(A)
+            if key not in ids:
+                ids[key] = len(elements)
+                elements.append(A)
+            row.append(ids[key])
+        table.append(row)
+        i += 1
+    return elements, np.array(table, dtype=np.intp)
 
+_group, _mul_table = _build_group(_gates)
+
+# _build_group starts from _gates[0], the identity, so the identity is always
+# element 0 of the group.  The search compares indices into the exact table,
+# so it never needs to test a floating point product against the identity.
+_ID = 0
+
+# The sequences never change, so the search is only performed the first time
+# check_identity is called.  Each call returns a new copy of the cached
+# sequences so that callers can modify the list they are given.
 def check_identity():
-    d=[I,H,X,Y,Z]
+    return [list(seq) for seq in _identity_sequences()]
+
+@lru_cache(maxsize=None)
+def _identity_sequences():
+    found = {}
+
+    # Find the sequences of 1 gate, then 2 gates, and so on up to 8 gates.
+    # states holds the product of every sequence of the current length, in
+    # lexicographic order.  Appending each of the gates to every sequence
+    # gives the products for the next length in a single NumPy operation,
+    # so the products of the shorter sequences are shared by all of the
+    # longer sequences that begin with them.
+    #
+    # The search is not pruned by skipping repeated gates or reversed
+    # sequences.  The board is checked against this list directly, so it
+    # must contain every sequence, including those with a gate next to
+    # itself and the reverse of each sequence.
+    states = np.array([_ID], dtype=np.intp)
+    for length in range(1, 9):
+        states = _mul_table[states].ravel()
+        if length >= 3:
+            idx = np.flatnonzero(states == _ID)
+            found[length] = np.array(np.unravel_index(idx, (5,) * length)).T.tolist()
+
+    # Report the sequences of 8 gates, then 7 gates, and so on down to 3 gates.
     final_identity = []
+    for length in range(8, 2, -1):
+        # Sequences of 3 gates have always been compared with the identity
+        # without rounding.  H has irrational entries, so a product containing
+        # H (which must contain two of them to be the identity) never matched
+        # exactly.  Keep excluding those sequences.
+        if length == 3:
+            found[3] = [seq for seq in found[3] if 1 not in seq]
 
-    for i in range(0,5):
-       for j in range(0,5):
-           for k in range(0,5):
-               for l in range(0,5):
-                   for m in range(0,5):
-                       for n in range(0,5):
-                           for o in range(0,5):
-                               for p in range(0,5):
-                                   if((np.dot(np.dot(np.dot(np.dot(np.dot(np.dot(np.dot(d[i],d[j]),d[k]),d[l]),d[m]),d[n]),d[o]),d[p])).round() == I).all():
-                                       final_identity.append([i,j,k,l,m,n,o,p])
-
-    for i in range(0,5):
-       for j in range(0,5):
-           for k in range(0,5):
-               for l in range(0,5):
-                   for m in range(0,5):
-                       for n in range(0,5):
-                           for o in range(0,5):
-                               if((np.dot(np.dot(np.dot(np.dot(np.dot(np.dot(d[i],d[j]),d[k]),d[l]),d[m]),d[n]),d[o])).round() == I).all():
-                                   final_identity.append([i,j,k,l,m,n,o])
-
-    for i in range(0,5):
-       for j in range(0,5):
-          for k in range(0,5):
-               for l in range(0,5):
-                   for m in range(0,5):
-                       for n in range(0,5):
-                           if((np.dot(np.dot(np.dot(np.dot(np.dot(d[i],d[j]),d[k]),d[l]),d[m]),d[n])).round() == I).all():
-                               final_identity.append([i,j,k,l,m,n])
-
-    for i in range(0,5):
-         for j in range(0,5):
-             for k in range(0,5):
-                 for l in range(0,5):
-                     for m in range(0,5):
-                         if((np.dot(np.dot(np.dot(np.dot(d[i],d[j]),d[k]),d[l]),d[m])).round() == I).all():
-                             final_identity.append([i,j,k,l,m])
-
-    for i in range(0,5):
-        for j in range(0,5):
-            for k in range(0,5):
-                for l in range(0,5):
-                    if((np.dot(np.dot(np.dot(d[i],d[j]),d[k]),d[l])).round() == I).all():
-                       final_identity.append([i,j,k,l])
-
-    for i in range(0,5):
-        for j in range(0,5):
-            for k in range(0,5):
-                if((np.dot(np.dot(d[i],d[j]),d[k])) == I).all():
-                    final_identity.append([i,j,k])
-    
-    return final_identity
+        final_identity.extend(found[length])
 
+    return final_identity